@@ -1,20 +1,79 @@
 import matplotlib.pyplot as plt
+import matplotlib.dates as mdates
 import pandas as pd
 import numpy as np
 import time
+import os
+import functools
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from numba import njit
 from Robinhood.RobhinhoodQuotes import write_sp500_data
 from Robinhood.sdp import get_optimal_weights
 
 #seaborn is a library for making statistical graphics in Python. It is built on top of matplotlib and closely integrated with pandas data structures.
 
 tickers = None
+PRICES_CSV = 'StockPortfolio_5year_close_prices.csv'  # Price file read by index_compiler
+
+# Trade type codes used by the compiled trade loop, indexed by code
+TRADE_TYPES = ('neither', 'long_entry', 'long_exit', 'short_entry', 'short_exit')
+NEITHER = TRADE_TYPES.index('neither')
+LONG_ENTRY = TRADE_TYPES.index('long_entry')
+LONG_EXIT = TRADE_TYPES.index('long_exit')
+SHORT_ENTRY = TRADE_TYPES.index('short_entry')
+SHORT_EXIT = TRADE_TYPES.index('short_exit')
+# Position codes for the position column and the trade loop state, indexed by code
+POSITIONS = ('none', 'long', 'short')
+FLAT = POSITIONS.index('none')
+LONG = POSITIONS.index('long')
+SHORT = POSITIONS.index('short')
+
+# Compile options shared by the numba kernels. The fastmath flags allow reassociation and FMA
+# contraction but not 'nnan'/'ninf', since the kernels rely on NaN checks for missing prices.
+# The numpy error model makes division by a zero price give inf/nan like NumPy instead of raising.
+kernel = njit(cache=True, fastmath={'reassoc', 'contract', 'arcp', 'nsz'}, boundscheck=False, error_model='numpy')
+
+@functools.lru_cache(maxsize=4)
+def _load_prices(file_path: str) -> pd.DataFrame:
+    """
+    Read and parse the closing prices CSV once per path. The cached DataFrame is shared, so callers must not modify it.
+    """
+    df = pd.read_csv(file_path)
+    df = df.set_index('Date')
+    df.index = pd.to_datetime(df.index, utc=True).tz_convert(None)  # Keep a DatetimeIndex, dates are midnight UTC
+    return df.astype(np.float32)  # Single precision is plenty for prices and halves memory traffic
+
+
+def _warm_cache(file_path: str) -> None:
+    """
+    Process pool initializer: parse the prices once per worker before any tasks run.
+    """
+    _load_prices(file_path)
+
+
+def price_pool(max_workers=None) -> ProcessPoolExecutor:
+    """
+    Returns a process pool whose workers have the price CSV parsed and cached.
+    Pass it as executor to csv_weighted_portfolio and individual_stock_prep_plot to share one pool.
+    """
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=_warm_cache, initargs=(PRICES_CSV,))
+
 
 def load_data(file_path: str) -> None:
     global tickers
-    df = pd.read_csv(file_path)
-    df = df.set_index('Date')
-    df.index = pd.to_datetime(df.index).strftime('%Y-%m-%d')
-    tickers = df.columns
+    tickers = _load_prices(file_path).columns
+
+
+def _aligned_prices_and_weights(df, weights):
+    """
+    Returns a (days, stocks) price array and a matching weight array for the weighted stocks found in df.
+    """
+    stocks = [stock for stock in df.columns if stock in weights]
+    idx = df.columns.get_indexer(stocks)
+    w = np.fromiter((weights[stock] for stock in stocks), dtype=np.float32, count=len(stocks))
+    prices = df.to_numpy(dtype=np.float32)[:, idx]
+    return prices, w
 
 
 def calculate_portfolio_value_no_rebalancing(df, weights, initial_investment=1000):
@@ -25,18 +84,9 @@ def calculate_portfolio_value_no_rebalancing(df, weights, initial_investment=100
     Returns:
     - pd.Series: Series of portfolio values over time.
     """
-    # Calculate initial investment distribution per stock
-    initial_investment_per_stock = {
-        stock: initial_investment * weight for stock, weight in weights.items() if stock in df.columns
-    }
-    
-    # Calculate portfolio value by allowing weights to drift over time
-    portfolio_values = []
-    for date, prices in df.iterrows():
-        portfolio_value = sum(prices[stock] * (initial_investment_per_stock[stock] / df[stock].iloc[0]) for stock in initial_investment_per_stock)
-        portfolio_values.append(portfolio_value)
-    
-    return pd.Series(portfolio_values, index=df.index)
+    # A rebalance frequency of 0 holds the first day's shares for the whole period
+    prices, w = _aligned_prices_and_weights(df, weights)
+    return pd.Series(_portfolio_values(prices, w, 0, initial_investment), index=df.index)
 
 
 def calculate_portfolio_value_with_rebalancing(df, weights, initial_investment=1000, rebalance_frequency=1):
@@ -52,46 +102,243 @@ def calculate_portfolio_value_with_rebalancing(df, weights, initial_investment=1
     Returns:
     - pd.Series: Series of portfolio values over time.
     """
-    portfolio_values = []
-    initial_investment_per_stock = {stock: initial_investment * weight for stock, weight in weights.items() if stock in df.columns}
-    
-    # Initial shares bought based on initial weights and first day's prices
-    shares = {stock: initial_investment_per_stock[stock] / df[stock].iloc[0] for stock in initial_investment_per_stock}
-    
-    for i, (date, prices) in enumerate(df.iterrows()):
-        # Calculate current portfolio value
-        portfolio_value = sum(prices[stock] * shares[stock] for stock in shares)
-        portfolio_values.append(portfolio_value)
-        
-        # Rebalance if needed (based on frequency) and not on the first date
-        if rebalance_frequency > 0 and i % rebalance_frequency == 0 and i != 0:
-            # Rebalance portfolio: calculate new investment per stock based on current portfolio value
-            new_investment_per_stock = {stock: portfolio_value * weight for stock, weight in weights.items()}
-            shares = {stock: new_investment_per_stock[stock] / prices[stock] for stock in new_investment_per_stock}
-    
+    prices, w = _aligned_prices_and_weights(df, weights)
+    portfolio_values = _portfolio_values(prices, w, rebalance_frequency, initial_investment)
     return pd.Series(portfolio_values, index=df.index)
 
 
-def add_ewma_bollinger_bands(portfolio_values, halflife_days):
+@kernel
+def _ewm_start(first_value):
+    """
+    EWM state (mean, cov, old_wt, sum_wt, sum_wt2, nobs) after the first value.
+    """
+    mean = float(first_value)
+    return mean, 0.0, 1.0, 1.0, 1.0, 1 if mean == mean else 0
+
+
+@kernel
+def _ewm_update(state, cur, old_wt_factor):
+    """
+    Fold the next value into the EWM state, following pandas' adjusted ewm mean/cov recurrence.
+    """
+    mean, cov, old_wt, sum_wt, sum_wt2, nobs = state
+    is_observation = cur == cur
+    nobs += is_observation
+    if mean == mean:
+        # Decay the weights of everything seen so far, then fold in the new value
+        sum_wt *= old_wt_factor
+        sum_wt2 *= old_wt_factor * old_wt_factor
+        old_wt *= old_wt_factor
+        if is_observation:
+            old_mean = mean
+            if mean != cur:
+                mean = (old_wt * old_mean + cur) / (old_wt + 1.0)
+            cov = (old_wt * (cov + (old_mean - mean) ** 2) + (cur - mean) ** 2) / (old_wt + 1.0)
+            sum_wt += 1.0
+            sum_wt2 += 1.0
+            old_wt += 1.0
+    elif is_observation:
+        mean = float(cur)
+    return mean, cov, old_wt, sum_wt, sum_wt2, nobs
+
+
+@kernel
+def _ewm_bands(state):
+    """
+    (ewma, bollinger_upper, bollinger_lower) for the current EWM state, using the unbiased EWM std.
+    """
+    mean, cov, old_wt, sum_wt, sum_wt2, nobs = state
+    if nobs == 0:
+        return np.nan, np.nan, np.nan
+
+    # Unbiased variance needs at least two effective observations
+    numerator = sum_wt * sum_wt
+    denominator = numerator - sum_wt2
+    std_dev = np.sqrt(max(numerator / denominator * cov, 0.0)) if denominator > 0 else np.nan
+    return mean, mean + 2 * std_dev, mean - 2 * std_dev
+
+
+@kernel
+def _ewma_bands(values, halflife_days):
+    """
+    Single pass EWMA and Bollinger Bands, matching pandas' ewm(halflife=...).mean() and .std(bias=False).
+
+    Returns a tuple of arrays (ewma, bollinger_upper, bollinger_lower).
+    """
+    if not halflife_days > 0:
+        raise ValueError("halflife must satisfy: halflife > 0")
+    n = len(values)
+    ewma = np.empty(n, dtype=values.dtype)
+    upper = np.empty(n, dtype=values.dtype)
+    lower = np.empty(n, dtype=values.dtype)
+    if n == 0:
+        return ewma, upper, lower
+
+    old_wt_factor = np.exp(np.log(0.5) / halflife_days)  # 1 - alpha
+    state = _ewm_start(values[0])
+    ewma[0], upper[0], lower[0] = _ewm_bands(state)
+    for i in range(1, n):
+        state = _ewm_update(state, values[i], old_wt_factor)
+        ewma[i], upper[i], lower[i] = _ewm_bands(state)
+
+    return ewma, upper, lower
+
+
+@kernel
+def _buy_shares(amount, w, day_prices):
+    """
+    Shares that split amount across the stocks by weight at the given day's prices.
+    """
+    shares = np.empty(len(w))
+    for j in range(len(w)):
+        shares[j] = amount * w[j] / day_prices[j]
+    return shares
+
+
+@kernel
+def _holdings_value(shares, day_prices):
+    """
+    Value of the held shares at the given day's prices.
+    """
+    value = 0.0
+    for j in range(len(shares)):
+        value += day_prices[j] * shares[j]
+    return value
+
+
+@kernel
+def _is_rebalance_day(day, rebalance_frequency):
+    """
+    A rebalance day is valued with the old shares, then rebalanced at its own prices (never on the first date).
+    A rebalance_frequency of 0 never rebalances.
+    """
+    return rebalance_frequency > 0 and day % rebalance_frequency == 0 and day != 0
+
+
+@kernel
+def _portfolio_values(prices, w, rebalance_frequency, initial_investment):
+    """
+    Portfolio value for each day of the (days, stocks) price array, rebalanced every rebalance_frequency days.
+    """
+    n_days = len(prices)
+    out = np.empty(n_days, dtype=prices.dtype)
+    if n_days == 0:
+        return out
+
+    # Initial shares bought based on initial weights and first day's prices
+    shares = _buy_shares(initial_investment, w, prices[0])
+    for i in range(n_days):
+        portfolio_value = _holdings_value(shares, prices[i])
+        out[i] = portfolio_value
+        if _is_rebalance_day(i, rebalance_frequency):
+            shares = _buy_shares(portfolio_value, w, prices[i])
+
+    return out
+
+
+@kernel
+def _portfolio_with_bands(prices, w, rebalance_frequency, halflife_days, initial_investment):
+    """
+    Fused portfolio value, EWMA and Bollinger Bands in one pass over the (days, stocks) price array.
+
+    Valuation and rebalancing are the same as _portfolio_values.
+
+    Returns a (days, 4) array of portfolio_value, ewma, bollinger_upper and bollinger_lower.
+    """
+    if not halflife_days > 0:
+        raise ValueError("halflife must satisfy: halflife > 0")
+    n_days = len(prices)
+    out = np.empty((n_days, 4), dtype=prices.dtype)
+    if n_days == 0:
+        return out
+
+    # Initial shares bought based on initial weights and first day's prices
+    shares = _buy_shares(initial_investment, w, prices[0])
+    old_wt_factor = np.exp(np.log(0.5) / halflife_days)  # 1 - alpha
+    for i in range(n_days):
+        portfolio_value = _holdings_value(shares, prices[i])
+
+        if i == 0:
+            state = _ewm_start(portfolio_value)
+        else:
+            state = _ewm_update(state, portfolio_value, old_wt_factor)
+        out[i, 0] = portfolio_value
+        out[i, 1], out[i, 2], out[i, 3] = _ewm_bands(state)
+
+        if _is_rebalance_day(i, rebalance_frequency):
+            shares = _buy_shares(portfolio_value, w, prices[i])
+
+    return out
+
+
+@kernel
+def _rolling_std(values, window):
+    """
+    Single pass rolling sample standard deviation, matching pandas' rolling(window).std().
+
+    Uses Welford's update for the value entering the window and its inverse for the value leaving it.
+    """
+    if window < 1:
+        raise ValueError("window must be at least 1")
+    n = len(values)
+    out = np.empty(n, dtype=values.dtype)
+    nobs = 0
+    mean = 0.0
+    m2 = 0.0
+    for i in range(n):
+        x = values[i]
+        if x == x:
+            nobs += 1
+            delta = x - mean
+            mean += delta / nobs
+            m2 += delta * (x - mean)
+        if i >= window:
+            y = values[i - window]
+            if y == y:
+                nobs -= 1
+                if nobs == 0:
+                    mean = 0.0
+                    m2 = 0.0
+                else:
+                    delta = y - mean
+                    mean -= delta / nobs
+                    m2 -= delta * (y - mean)
+        out[i] = np.sqrt(max(m2 / (nobs - 1), 0.0)) if nobs >= window and nobs > 1 else np.nan
+    return out
+
+
+def _simple_window_bands(values, ewma, std_window):
+    """
+    Bollinger Bands around ewma sized by a simple rolling standard deviation over std_window days.
+
+    Returns a tuple of arrays (bollinger_upper, bollinger_lower).
+    """
+    std_dev = _rolling_std(values, std_window)
+    return ewma + 2 * std_dev, ewma - 2 * std_dev
+
+
+def add_ewma_bollinger_bands(portfolio_values, halflife_days, std_window=None):
     """
     Add EWMA and Bollinger Bands to the portfolio values.
+
+    The bands use the EWM standard deviation by default. Pass std_window to size them with a simple
+    rolling standard deviation over that many days instead.
     """
-    df = pd.DataFrame({'portfolio_value': portfolio_values})
-    
-    # Calculate EWMA
-    df['ewma'] = df['portfolio_value'].ewm(halflife=halflife_days).mean()
-    
-    # Calculate standard deviation and Bollinger Bands
-    df['std_dev'] = df['portfolio_value'].rolling(window=halflife_days).std()
-    df['bollinger_upper'] = df['ewma'] + (2 * df['std_dev'])
-    df['bollinger_lower'] = df['ewma'] - (2 * df['std_dev'])
-    
-    df.drop(columns=['std_dev'], inplace=True)
-    return df
+    # The kernels allocate their outputs in the input dtype: keep float32 as is, promote integers to float64
+    values = portfolio_values.to_numpy(dtype=np.result_type(portfolio_values.dtype, np.float32))
+    ewma, upper, lower = _ewma_bands(values, halflife_days)
+    if std_window is not None:
+        upper, lower = _simple_window_bands(values, ewma, std_window)
+    return pd.DataFrame({
+        'portfolio_value': portfolio_values,
+        'ewma': ewma,
+        'bollinger_upper': upper,
+        'bollinger_lower': lower,
+    }, index=portfolio_values.index)
 
 
 # Test code
-def index_compiler(weights_dict: dict, title: str, halflife_days: int = 20, initial_investment=1000, rebalance=True, rebalance_frequency=1) -> tuple:
+def index_compiler(weights_dict: dict, title: str, halflife_days: int = 20, initial_investment=1000, rebalance=True, rebalance_frequency=1, std_window=None) -> tuple:
     """
     Parameters:
     - weights_dict: Dictionary of stock tickers and their weights.
@@ -102,26 +349,26 @@ def index_compiler(weights_dict: dict, title: str, halflife_days: int = 20, init
     - rebalance_frequency: Frequency of rebalancing in days.
         - 5 days for weekly rebalancing. Since the market is open 5 days a week.
         - Default is daily rebalancing.
+    - std_window: If given, size the Bollinger Bands with a simple rolling standard deviation over this many days
+      instead of the EWM standard deviation.
 
     Computes portfolio value and adds EWMA and Bollinger Bands.
 
     Returns a tuple of the DataFrame with EWMA and Bollinger Bands, the weights dictionary, and the title.
     """
-    df = pd.read_csv('StockPortfolio_5year_close_prices.csv')
-    df = df.set_index('Date')
-    df.index = pd.to_datetime(df.index).strftime('%Y-%m-%d')
+    df = _load_prices(PRICES_CSV)
 
     # Validate that weights sum to 1
     total_weight = sum(weights_dict.values())
     if total_weight != 1:
         weights_dict = {ticker: weight / total_weight for ticker, weight in weights_dict.items()}
 
-    if rebalance:
-        portfolio_values = calculate_portfolio_value_with_rebalancing(df, weights_dict, initial_investment, rebalance_frequency)
-    else:
-        portfolio_values = calculate_portfolio_value_no_rebalancing(df, weights_dict, initial_investment)
-
-    ewma_bollinger_df = add_ewma_bollinger_bands(portfolio_values, halflife_days)
+    # Portfolio value, EWMA and bands come out of a single fused pass over the prices
+    prices, w = _aligned_prices_and_weights(df, weights_dict)
+    values_and_bands = _portfolio_with_bands(prices, w, rebalance_frequency if rebalance else 0, halflife_days, initial_investment)
+    if std_window is not None:
+        values_and_bands[:, 2], values_and_bands[:, 3] = _simple_window_bands(values_and_bands[:, 0], values_and_bands[:, 1], std_window)
+    ewma_bollinger_df = pd.DataFrame(values_and_bands, index=df.index, columns=['portfolio_value', 'ewma', 'bollinger_upper', 'bollinger_lower'])
     return ewma_bollinger_df, weights_dict, title
 
 
@@ -140,66 +387,67 @@ def plot_returns(returns_n_weights, trade_logs=None, trades_tally=0):
     pnl_dates = []
 
     for ewma_bollinger_df, weights, title in returns_n_weights:
+        # Plain datetime64 x values, converted once and shared by every line of this portfolio
+        dates = ewma_bollinger_df.index.values.astype('datetime64[D]')
         if title == "SPY":
             # Only plot the portfolio value for SPY
-            plt.plot(ewma_bollinger_df.index, ewma_bollinger_df['portfolio_value'], 
+            plt.plot(dates, ewma_bollinger_df['portfolio_value'], 
                     label=f"S&P Index (SPY)", linestyle='-', linewidth=2, color='black', alpha=0.8)
         else:
             # Plot the Bollinger Bands, EWMA, and Portfolio Value for other titles
             if not labeled_bands:
-                plt.fill_between(ewma_bollinger_df.index, ewma_bollinger_df['bollinger_upper'], 
+                plt.fill_between(dates, ewma_bollinger_df['bollinger_upper'], 
                                 ewma_bollinger_df['bollinger_lower'], color='gray', alpha=0.2, 
                                 label=f"Bollinger Bands Range")
-                plt.plot(ewma_bollinger_df.index, ewma_bollinger_df['bollinger_upper'], color='green', linestyle=':', label="Upper Band")
-                plt.plot(ewma_bollinger_df.index, ewma_bollinger_df['bollinger_lower'], color='red', linestyle=':', label="Lower Band")
+                plt.plot(dates, ewma_bollinger_df['bollinger_upper'], color='green', linestyle=':', label="Upper Band")
+                plt.plot(dates, ewma_bollinger_df['bollinger_lower'], color='red', linestyle=':', label="Lower Band")
                 labeled_bands = True
             else:
-                plt.fill_between(ewma_bollinger_df.index, ewma_bollinger_df['bollinger_upper'], 
+                plt.fill_between(dates, ewma_bollinger_df['bollinger_upper'], 
                                 ewma_bollinger_df['bollinger_lower'], color='gray', alpha=0.2)
-                plt.plot(ewma_bollinger_df.index, ewma_bollinger_df['bollinger_upper'], color='green', linestyle=':')
-                plt.plot(ewma_bollinger_df.index, ewma_bollinger_df['bollinger_lower'], color='red', linestyle=':')
+                plt.plot(dates, ewma_bollinger_df['bollinger_upper'], color='green', linestyle=':')
+                plt.plot(dates, ewma_bollinger_df['bollinger_lower'], color='red', linestyle=':')
 
-            plt.plot(ewma_bollinger_df.index, ewma_bollinger_df['portfolio_value'], 
+            plt.plot(dates, ewma_bollinger_df['portfolio_value'], 
                     label=f"{title} Portfolio Value")
-            plt.plot(ewma_bollinger_df.index, ewma_bollinger_df['ewma'], 
+            plt.plot(dates, ewma_bollinger_df['ewma'], 
                     label=f"{title} EWMA", linestyle='--')
 
 
     # Add trade points and PnL line if available
     if trade_logs:
-        # Extract cumulative PnL directly from trade logs
+        # Marker style per trade type, in legend order
+        trade_styles = {
+            'long_entry': dict(color='blue', marker='^', label='Open Long'),
+            'long_exit': dict(color='orange', marker='v', label='Close Long'),
+            'short_entry': dict(color='green', marker='^', label='Open Short'),
+            'short_exit': dict(color='red', marker='v', label='Close Short'),
+        }
+        trade_dates = {trade_type: [] for trade_type in trade_styles}
+        trade_pnls = {trade_type: [] for trade_type in trade_styles}
+
+        # Extract cumulative PnL and group trades by type in one pass over the trade logs
         for trade_date, trade_price, trade_type, total_trade_pnl in trade_logs:
             pnl_dates.append(trade_date)
             cumulative_pnl.append(total_trade_pnl)
+            if trade_type in trade_styles:
+                trade_dates[trade_type].append(trade_date)
+                trade_pnls[trade_type].append(total_trade_pnl)
 
         # Plot the PnL line
-        plt.plot(pnl_dates, cumulative_pnl, label="Our Mean Reversion Trades Cumulative PnL", color='grey', linewidth=2)
+        plt.plot(np.array(pnl_dates, dtype='datetime64[D]'), cumulative_pnl, label="Our Mean Reversion Trades Cumulative PnL", color='grey', linewidth=2)
 
-        # Plot trade markers on the PnL tracker
-        used_labels = set()  # Track used labels for legend only
-        for trade_date, trade_price, trade_type, total_trade_pnl in trade_logs:
-            if trade_type == 'long_entry':
-                plt.scatter(trade_date, total_trade_pnl, color='blue', marker='^', s=50, 
-                            label='Open Long' if 'Open Long' not in used_labels else "", alpha=0.8, zorder=5)
-                used_labels.add('Open Long')
-            elif trade_type == 'long_exit':
-                plt.scatter(trade_date, total_trade_pnl, color='orange', marker='v', s=50, 
-                            label='Close Long' if 'Close Long' not in used_labels else "", alpha=0.8, zorder=5)
-                used_labels.add('Close Long')
-            elif trade_type == 'short_entry':
-                plt.scatter(trade_date, total_trade_pnl, color='green', marker='^', s=50, 
-                            label='Open Short' if 'Open Short' not in used_labels else "", alpha=0.8, zorder=5)
-                used_labels.add('Open Short')
-            elif trade_type == 'short_exit':
-                plt.scatter(trade_date, total_trade_pnl, color='red', marker='v', s=50, 
-                            label='Close Short' if 'Close Short' not in used_labels else "", alpha=0.8, zorder=5)
-                used_labels.add('Close Short')
-            
+        # Plot trade markers on the PnL tracker, one scatter call per trade type
+        for trade_type, style in trade_styles.items():
+            if trade_dates[trade_type]:
+                plt.scatter(np.array(trade_dates[trade_type], dtype='datetime64[D]'), trade_pnls[trade_type], s=50, alpha=0.8, zorder=5, **style)
 
     plt.title("Cumulative PnL with Trades")
     plt.xlabel("Date")
     plt.ylabel("PnL ($)")
-    plt.xticks(ticks=range(0, len(pnl_dates), max(1, len(pnl_dates) // 10)), rotation=45)
+    plt.gca().xaxis_date()
+    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m-%d'))
+    plt.xticks(rotation=45)
     weights_dict = returns_n_weights[0][1] # Get the weights of the portfolio
     weights_list = [f"{ticker}: {weight:.2%}" for ticker, weight in weights_dict.items()]  # Format each stock weight
     weights_text = "\n".join(weights_list)  # Combine into a multi-line string
@@ -219,9 +467,11 @@ def plot_returns(returns_n_weights, trade_logs=None, trades_tally=0):
 
 
 
-def csv_weighted_portfolio(file_path: str, weights ,halflife_days: int = 20, initial_investment=1000) -> None:
+def csv_weighted_portfolio(file_path: str, weights ,halflife_days: int = 20, initial_investment=1000, executor=None, std_window=None) -> None:
     """
     Creates an equally weighted portfolio based on the CSV and plots its value with EWMA and Bollinger Bands.
+    The portfolios are computed on executor (see price_pool), or on a new pool if none is given.
+    std_window is passed on to index_compiler to use simple-window Bollinger Bands.
     """
     global tickers
     load_data(file_path)
@@ -230,126 +480,164 @@ def csv_weighted_portfolio(file_path: str, weights ,halflife_days: int = 20, ini
     #equal_weights = {ticker: 1/len(tickers_adjusted) for ticker in tickers_adjusted}
     equal_weights = weights # this mf is a diciotnary
     print(f"Weights: {equal_weights}")
-    equal_portfolio_rebalanced = index_compiler(equal_weights, 'Equally Weighted Portfolio (Rebalanced Daily)', halflife_days, initial_investment, rebalance=True, rebalance_frequency=1)
-    equal_portfolio_no_rebalancing = index_compiler(equal_weights, 'Equally Weighted Portfolio (No Rebalancing)', halflife_days, initial_investment, rebalance=False,)
-    equal_portfolio_rebalanced_weekly = index_compiler(equal_weights, 'Equally Weighted Portfolio (Rebalanced Weekly)', halflife_days, initial_investment, rebalance=True, rebalance_frequency=5)
+    # The three portfolios are independent, so compute them in parallel
+    with contextlib.nullcontext(executor) if executor is not None else price_pool(max_workers=3) as executor:
+        rebalanced_future = executor.submit(index_compiler, equal_weights, 'Equally Weighted Portfolio (Rebalanced Daily)', halflife_days, initial_investment, True, 1, std_window)
+        no_rebalancing_future = executor.submit(index_compiler, equal_weights, 'Equally Weighted Portfolio (No Rebalancing)', halflife_days, initial_investment, False, 1, std_window)
+        rebalanced_weekly_future = executor.submit(index_compiler, equal_weights, 'Equally Weighted Portfolio (Rebalanced Weekly)', halflife_days, initial_investment, True, 5, std_window)
+        equal_portfolio_rebalanced = rebalanced_future.result()
+        equal_portfolio_no_rebalancing = no_rebalancing_future.result()
+        equal_portfolio_rebalanced_weekly = rebalanced_weekly_future.result()
     return [equal_portfolio_rebalanced_weekly]
 
     # plot_returns([equal_portfolio_rebalanced])
 
 
-def individual_stock_prep_plot(tickers_recieved, halflife_days: int = 20, initial_investment=1000) -> None:
+def _single_stock_portfolio(ticker, halflife_days, initial_investment, std_window):
+    """
+    index_compiler for a portfolio holding only ticker. Module level so it can be sent to worker processes.
+    """
+    return index_compiler({ticker: 1}, f'{ticker}', halflife_days, initial_investment, rebalance=True, std_window=std_window)
+
+
+def individual_stock_prep_plot(tickers_recieved, halflife_days: int = 20, initial_investment=1000, executor=None, std_window=None) -> None:
     """
     Creates a portfolio for each stock in the csv and plots its value with EWMA and Bollinger Bands.
+    The portfolios are computed on executor (see price_pool), or on a new pool if none is given.
+    std_window is passed on to index_compiler to use simple-window Bollinger Bands.
 
     """
-    #specific ticker plot data
-    ticker_data = []
-    for ticker in tickers_recieved:
-        indv_dict = {ticker: 1}
-        ind_stock_data = index_compiler(indv_dict, f'{ticker}', halflife_days, initial_investment, rebalance=True)
-        ticker_data.append(ind_stock_data)
+    #specific ticker plot data, one task per ticker
+    n = len(tickers_recieved)
+    # A new pool gets no more workers than tickers, since each worker parses the full CSV on startup
+    max_workers = max(1, min(n, os.cpu_count() or 1))
+    with contextlib.nullcontext(executor) if executor is not None else price_pool(max_workers) as executor:
+        ticker_data = list(executor.map(_single_stock_portfolio, tickers_recieved, [halflife_days] * n, [initial_investment] * n, [std_window] * n))
     return ticker_data
 
 
-def track_trades(df, initial_investment=1000):
+@kernel
+def _track_trades_core(pv, ewma, upper, lower, initial_investment):
     """
-    Parameters:
-    - df: DataFrame with the date as the index and portfolio values, EWMA, and Bollinger Bands as columns.
-    - portfolio_start_val: Initial investment amount.
+    Compiled mean reversion state machine behind track_trades.
 
-    Returns a tuple of trade logs and the total number of trades.
-    trade_logs is a list of tuples with (trade_date, trade_price, trade_type, total_trade_pnl).
-    trades_tally is an integer representing the total number of trades.
+    Returns a tuple of arrays (trade_types, total_pnl, logged_pnl):
+    - trade_types: int8 codes indexing TRADE_TYPES (NEITHER, LONG_ENTRY, ...) for each day.
+    - total_pnl: running realized balance for each day.
+    - logged_pnl: value recorded in the trade log, including unrealized PnL on non-exit days.
     """
-    current_position = None
-    entry_price = 0
-    realized_balance = initial_investment  # Start with initial investment
-    unrealized_pnl = 0
-    trades_tally = 0
-
-    # Ensure these columns exist in your DataFrame
-    df['trade_pnl'] = 0.0
-    df['total_trade_pnl'] = 0.0
-    df['position'] = None
-
-    # Lists for tracking trades
-    trade_logs = []  # Log of all trades for plotting
-    df.loc[df.index[0], 'total_trade_pnl'] = realized_balance
-    trade_logs.append((df.index[0], df.loc[df.index[0], 'portfolio_value'], 'neither', realized_balance))
-    for i in range(1,len(df)):
-        price = df.loc[df.index[i], 'portfolio_value']
-        ewma = df.loc[df.index[i], 'ewma']
-        upper = df.loc[df.index[i], 'bollinger_upper']
-        lower = df.loc[df.index[i], 'bollinger_lower']
-
-        if i > 0:
-            # Carry forward the previous total_trade_pnl
-            df.loc[df.index[i], 'total_trade_pnl'] = df.loc[df.index[i - 1], 'total_trade_pnl']
-
-        else:
-            # Initialize for the first row
-            df.loc[df.index[i], 'total_trade_pnl'] = 0
+    n = len(pv)
+    trade_types = np.full(n, NEITHER, dtype=np.int8)
+    total_pnl = np.empty(n)
+    logged_pnl = np.empty(n)
+    if n == 0:
+        return trade_types, total_pnl, logged_pnl
+
+    current_position = FLAT
+    entry_price = 0.0
+    units_traded = 0.0
+    realized_balance = float(initial_investment)  # Start with initial investment
+
+    total_pnl[0] = realized_balance
+    logged_pnl[0] = realized_balance
+    for i in range(1, n):
+        price = pv[i]
+
+        # Carry forward the previous total_trade_pnl
+        total_pnl[i] = total_pnl[i - 1]
 
         # Calculate unrealized PnL if a position is open
-        if current_position == 'short':
+        if current_position == SHORT:
             unrealized_pnl = realized_balance * (entry_price - price) / entry_price
-        elif current_position == 'long':
+        elif current_position == LONG:
             unrealized_pnl = realized_balance * (price - entry_price) / entry_price
         else:
-            unrealized_pnl = 0
-
-        # Append to trade_logs
-        trade_logs.append((df.index[i], price, 'neither', df.loc[df.index[i], 'total_trade_pnl'] + unrealized_pnl))
+            unrealized_pnl = 0.0
+        logged_pnl[i] = total_pnl[i] + unrealized_pnl
 
-        # Enter a short position
-        if current_position is None and price > upper:
-            print(f"Short position entered at {price}")
-            current_position = 'short'
+        # Enter a short position (all-in on realized balance)
+        if current_position == FLAT and price > upper[i]:
+            current_position = SHORT
             entry_price = price
-            df.loc[df.index[i], 'position'] = 'short'
-
-            # Calculate units traded (all-in on realized balance)
             units_traded = realized_balance / entry_price
-            trade_logs[i] = (trade_logs[i][0], trade_logs[i][1], 'short_entry', trade_logs[i][3])
+            trade_types[i] = SHORT_ENTRY
 
-        # Enter a long position
-        elif current_position is None and price < lower:
-            print(f"Long position entered at {price}")
-            current_position = 'long'
+        # Enter a long position (all-in on realized balance)
+        elif current_position == FLAT and price < lower[i]:
+            current_position = LONG
             entry_price = price
-            df.loc[df.index[i], 'position'] = 'long'
-
-            # Calculate units traded (all-in on realized balance)
             units_traded = realized_balance / entry_price
-            trade_logs[i] = (trade_logs[i][0], trade_logs[i][1], 'long_entry', trade_logs[i][3])
+            trade_types[i] = LONG_ENTRY
 
         # Exit short position
-        elif current_position == 'short' and price < ewma:
-            print(f"Short position exited at {price}")
+        elif current_position == SHORT and price < ewma[i]:
             pnl = units_traded * (entry_price - price)  # Profit from price decrease
-            realized_balance += pnl  # Update realized balance
-            df.loc[df.index[i], 'total_trade_pnl'] += pnl
-            current_position = None
-            trades_tally += 1
-            trade_logs[i] = (trade_logs[i][0], trade_logs[i][1], 'short_exit', df.loc[df.index[i], 'total_trade_pnl'])
+            realized_balance += pnl
+            total_pnl[i] += pnl
+            logged_pnl[i] = total_pnl[i]
+            current_position = FLAT
+            trade_types[i] = SHORT_EXIT
 
         # Exit long position
-        elif current_position == 'long' and price > ewma:
-            print(f"Long position exited at {price}")
+        elif current_position == LONG and price > ewma[i]:
             pnl = units_traded * (price - entry_price)  # Profit from price increase
-            realized_balance += pnl  # Update realized balance
-            df.loc[df.index[i], 'total_trade_pnl'] += pnl
-            current_position = None
-            trades_tally += 1
-            trade_logs[i] = (trade_logs[i][0], trade_logs[i][1], 'long_exit', df.loc[df.index[i], 'total_trade_pnl'])
+            realized_balance += pnl
+            total_pnl[i] += pnl
+            logged_pnl[i] = total_pnl[i]
+            current_position = FLAT
+            trade_types[i] = LONG_EXIT
+
+    return trade_types, total_pnl, logged_pnl
+
+
+def track_trades(df, initial_investment=1000):
+    """
+    Parameters:
+    - df: DataFrame with the date as the index and portfolio values, EWMA, and Bollinger Bands as columns.
+    - portfolio_start_val: Initial investment amount.
+
+    Returns a tuple of trade logs and the total number of trades.
+    trade_logs is a list of tuples with (trade_date, trade_price, trade_type, total_trade_pnl).
+    trades_tally is an integer representing the total number of trades.
+    """
+    pv = df['portfolio_value'].to_numpy()
+    trade_types, total_pnl, logged_pnl = _track_trades_core(
+        pv,
+        df['ewma'].to_numpy(),
+        df['bollinger_upper'].to_numpy(),
+        df['bollinger_lower'].to_numpy(),
+        initial_investment,
+    )
+
+    # Position opened on each day as codes into POSITIONS
+    position = np.full(len(df), FLAT, dtype=np.int8)
+    position[trade_types == LONG_ENTRY] = LONG
+    position[trade_types == SHORT_ENTRY] = SHORT
+
+    # Report each trade; only trade days are visited
+    trade_messages = {
+        SHORT_ENTRY: "Short position entered at",
+        LONG_ENTRY: "Long position entered at",
+        SHORT_EXIT: "Short position exited at",
+        LONG_EXIT: "Long position exited at",
+    }
+    for i in np.flatnonzero(trade_types != NEITHER):
+        print(f"{trade_messages[trade_types[i]]} {pv[i]}")
+
+    # Build the trade log from the returned arrays in one go
+    trade_type_names = np.array(TRADE_TYPES)[trade_types].tolist()
+    trade_logs = list(zip(df.index, pv, trade_type_names, logged_pnl))  # Log of all trades for plotting
 
-    print(df[['portfolio_value', 'position', 'total_trade_pnl']])
+    trades_tally = int(np.count_nonzero((trade_types == LONG_EXIT) | (trade_types == SHORT_EXIT)))
+    realized_balance = total_pnl[-1] if len(total_pnl) else initial_investment
+    trade_codes = trade_types[trade_types != NEITHER]
+    position_open = len(trade_codes) > 0 and trade_codes[-1] in (LONG_ENTRY, SHORT_ENTRY)
 
-    # Debug output
+    # Debug output, on a copy so the caller's DataFrame is left untouched
+    print(df[['portfolio_value']].assign(position=pd.Categorical.from_codes(position, categories=POSITIONS), total_trade_pnl=total_pnl))
     print("Total Trades:", trades_tally)
     print("Final Realized Balance:", realized_balance)
-    if current_position == 'Open':
+    if position_open:
         print("Position still open, This means the graph ends with an open position")
 
     return trade_logs, trades_tally
@@ -397,16 +685,20 @@ stock_picks = [
     "JANX", "CASH", "PDCO"
 ]
 
-# write_sp500_data(stock_picks, 'year', 5) #write the data to a csv file
-balls = get_optimal_weights() 
-dict(sorted(balls.items(), key=lambda item: item[1]))
-data = csv_weighted_portfolio('StockPortfolio_5year_close_prices.csv', balls) #access the data from the csv file
-# print(data[0][0]) 
-
-trade_logs, tradesTally = track_trades(data[0][0], initial_investment=1000)
-# print(trade_logs)
-# tickers_data = individual_stock_prep_plot(['WBA','AAPL'], halflife_days=20, initial_investment=1000)
-tickers_data = [] #for now we will not use this data
-spy_data = individual_stock_prep_plot(['SPY'],halflife_days=20, initial_investment=1000) #add SPY to the list of stock symbols for comparison as it is the S&P 500 ETF
-combined_data = data + tickers_data + spy_data #combine the data
-plot_returns(combined_data, trade_logs=trade_logs, trades_tally=tradesTally) 
\ No newline at end of file
+# Worker processes import this module, so only run the script from the main process
+if __name__ == "__main__":
+    # write_sp500_data(stock_picks, 'year', 5) #write the data to a csv file
+    balls = get_optimal_weights() 
+    dict(sorted(balls.items(), key=lambda item: item[1]))
+    with price_pool() as pool: # one pool of workers for every portfolio below
+        data = csv_weighted_portfolio('StockPortfolio_5year_close_prices.csv', balls, executor=pool) #access the data from the csv file
+        # print(data[0][0]) 
+
+        # tickers_data = individual_stock_prep_plot(['WBA','AAPL'], halflife_days=20, initial_investment=1000, executor=pool)
+        tickers_data = [] #for now we will not use this data
+        spy_data = individual_stock_prep_plot(['SPY'],halflife_days=20, initial_investment=1000, executor=pool) #add SPY to the list of stock symbols for comparison as it is the S&P 500 ETF
+
+    trade_logs, tradesTally = track_trades(data[0][0], initial_investment=1000)
+    # print(trade_logs)
+    combined_data = data + tickers_data + spy_data #combine the data
+    plot_returns(combined_data, trade_logs=trade_logs, trades_tally=tradesTally) 